@@ -0,0 +1,96 @@
+# distutils: language = c
+# cython: language_level = 3
+
+from cpython.unicode cimport Py_UNICODE_ISALNUM
+
+
+cdef inline bint _is_word(Py_UCS4 c):
+    return c == u'_' or Py_UNICODE_ISALNUM(c)
+
+
+cdef Py_ssize_t _match_var(str s, Py_ssize_t i, Py_ssize_t n,
+                           Py_ssize_t *start, Py_ssize_t *stop):
+    """Match a ``$var`` or ``${var}`` reference at ``s[i]``.
+
+    Returns the index following the reference, or -1 if there isn't one; the
+    bounds of the variable name are stored in ``start`` and ``stop``.
+    """
+    cdef Py_ssize_t j = i + 1
+    if i >= n or s[i] != u'$':
+        return -1
+    if j < n and s[j] == u'{':
+        j += 1
+        start[0] = j
+        while j < n and _is_word(s[j]):
+            j += 1
+        if j == start[0] or j >= n or s[j] != u'}':
+            return -1
+        stop[0] = j
+        return j + 1
+    start[0] = j
+    while j < n and _is_word(s[j]):
+        j += 1
+    if j == start[0]:
+        return -1
+    stop[0] = j
+    return j
+
+
+cdef _unescape(list l, str s, Py_ssize_t start, Py_ssize_t end):
+    """Append ``s[start:end]`` to ``l`` with backslash escapes collapsed."""
+    cdef Py_ssize_t pos = start
+    cdef Py_ssize_t last = end - 1
+    while pos < last:
+        if s[pos] == u'\\':
+            l.append(s[start:pos])
+            # drop the backslash, along with the newline for line continuations
+            start = pos + 2 if s[pos + 1] == u'\n' else pos + 1
+            pos += 2
+        else:
+            pos += 1
+    if start != end:
+        l.append(s[start:end])
+
+
+def var_template(str val not None):
+    """Split ``val`` into literal text and the variable names it references.
+
+    :param val: string to split
+    :return: tuple alternating between literal text, with backslash escapes
+        collapsed, and variable names; it always starts and ends with
+        literal text.
+    """
+    cdef Py_ssize_t n = len(val), i = 0, prev = 0, end, start, stop
+    cdef Py_UCS4 c
+    cdef list parts = []
+    cdef list l = []
+    if '$' not in val:
+        # nothing to interpolate, skip scanning entirely
+        if '\\' not in val:
+            return (val,)
+        _unescape(l, val, 0, n)
+        return (''.join(l),)
+
+    while i < n:
+        c = val[i]
+        if c == u'\\':
+            # it's escaped, either it's \\$ or \\${; leave it in the
+            # literal chunk for backslash cleansing.
+            end = _match_var(val, i + 1, n, &start, &stop)
+            i = end if end != -1 else i + 1
+        elif c == u'$':
+            end = _match_var(val, i, n, &start, &stop)
+            if end == -1:
+                i += 1
+                continue
+            _unescape(l, val, prev, i)
+            parts.append(''.join(l))
+            del l[:]
+            parts.append(val[start:stop])
+            prev = i = end
+        else:
+            i += 1
+
+    _unescape(l, val, prev, n)
+    parts.append(''.join(l))
+    return tuple(parts)
@@ -8,17 +8,17 @@ Its primary usage is for reading things like gentoo make.conf's, or
 libtool .la files that are bash compatible, but non-executable.
 """
 
+import threading
+from functools import lru_cache, partial
 from shlex import shlex
 
 from .demandload import demand_compile_regexp
-from .fileutils import readlines
 from .log import logger
 from .mappings import ProtectedDict
 
 demand_compile_regexp('line_cont_regexp', r'^(.*[^\\]|)\\$')
 demand_compile_regexp('inline_comment_regexp', r'^.*\s#.*$')
 demand_compile_regexp('var_find', r'\\?(\${\w+}|\$\w+)')
-demand_compile_regexp('backslash_find', r'\\.')
 demand_compile_regexp('ansi_escape_re', r'(\x9B|\x1B\[)[0-?]*[ -/]*[@-~]')
 
 __all__ = (
@@ -44,7 +44,18 @@ def iter_read_bash(bash_source, allow_inline_comments=True,
     :return: yields lines w/ commenting stripped out
     """
     if isinstance(bash_source, str):
-        bash_source = readlines(bash_source, True)
+        return _iter_read_bash_file(
+            bash_source, allow_inline_comments, allow_line_cont, enum_line)
+    return _iter_read_bash(
+        bash_source, allow_inline_comments, allow_line_cont, enum_line)
+
+
+def _iter_read_bash_file(path, *args):
+    with open(path, 'r', encoding='utf8') as f:
+        yield from _iter_read_bash(map(str.strip, f), *args)
+
+
+def _iter_read_bash(bash_source, allow_inline_comments, allow_line_cont, enum_line):
     s = ''
     for lineno, line in enumerate(bash_source, 1):
         if allow_line_cont and s:
@@ -57,7 +68,8 @@ def iter_read_bash(bash_source, allow_inline_comments=True,
                 if allow_inline_comments:
                     if (not allow_line_cont or
                             (allow_line_cont and inline_comment_regexp.match(line))):
-                        s = s.split("#", 1)[0].rstrip()
+                        if (idx := s.find('#')) >= 0:
+                            s = s[:idx].rstrip()
                 if allow_line_cont and line_cont_regexp.match(line):
                     s = s.rstrip('\\\n')
                     continue
@@ -73,14 +85,30 @@ def iter_read_bash(bash_source, allow_inline_comments=True,
             yield s
 
 
-def read_bash(*args, **kwargs):
+def read_bash(bash_source, allow_inline_comments=True,
+              allow_line_cont=False, enum_line=False):
     """Read a file honoring bash commenting rules.
 
     See :py:func:`iter_read_bash` for parameter details.
 
     Returns a list of lines w/ comments stripped out.
     """
-    return list(iter_read_bash(*args, **kwargs))
+    if allow_line_cont or enum_line:
+        return list(iter_read_bash(
+            bash_source, allow_inline_comments, allow_line_cont, enum_line))
+
+    # without line continuations each line stands alone, so skip the
+    # generator and process everything in one go
+    if isinstance(bash_source, str):
+        with open(bash_source, 'r', encoding='utf8') as f:
+            lines = f.readlines()
+    else:
+        lines = bash_source
+    lines = map(str.lstrip, lines)
+    if allow_inline_comments:
+        return [s[:i].rstrip() if (i := s.find('#')) > 0 else s.rstrip()
+                for s in lines if s and s[0] != '#']
+    return [s.rstrip() for s in lines if s and s[0] != '#']
 
 
 def read_bash_dict(bash_source, vars_dict=None, sourcing_command=None):
@@ -115,49 +143,26 @@ def read_bash_dict(bash_source, vars_dict=None, sourcing_command=None):
         infile = bash_source
     else:
         f = bash_source
-    s = bash_parser(f, sourcing_command=sourcing_command, env=d, infile=infile)
+    s = _parser_pool.parsers.pop(sourcing_command, None)
+    if s is None:
+        s = bash_parser(f, sourcing_command=sourcing_command, env=d, infile=infile)
+    else:
+        s.reset(f, env=d, infile=infile)
 
     try:
-        tok = ""
         try:
-            while tok is not None:
-                key = s.get_token()
-                if key == 'export':
-                    # discard 'export' token from "export VAR=VALUE" lines
-                    key = s.get_token()
-                if key is None:
-                    break
-                elif key.isspace():
-                    # we specifically have to check this, since we're
-                    # screwing with the whitespace filters below to
-                    # detect empty assigns
-                    continue
-                eq = s.get_token()
-                if eq != '=':
-                    raise BashParseError(
-                        bash_source, s.lineno,
-                        "got token %r, was expecting '='" % eq)
-                val = s.get_token()
-                if val is None:
-                    val = ''
-                elif val == 'export':
-                    val = s.get_token()
-                # look ahead to see if we just got an empty assign.
-                next_tok = s.get_token()
-                if next_tok == '=':
-                    # ... we did.
-                    # leftmost insertions, thus reversed ordering
-                    s.push_token(next_tok)
-                    s.push_token(val)
-                    val = ''
-                else:
-                    s.push_token(next_tok)
-                d[key] = val
+            # assignments must land in the env before the next one is
+            # parsed, which update() does while consuming the iterator; for
+            # a plain dict this happens entirely at the C level
+            d.update(s.iter_assignments())
         except ValueError as e:
             raise BashParseError(bash_source, s.lineno, str(e)) from e
     finally:
         if close and f is not None:
             f.close()
+        # drop references to the source and env before pooling the parser
+        s.reset(None)
+        _parser_pool.parsers[sourcing_command] = s
     if protected:
         d = d.new
     return d
@@ -212,14 +217,122 @@ def read_dict(bash_source, splitter="=", source_isiter=False,
     return d
 
 
-def _nuke_backslash(s):
-    s = s.group()
-    if s == "\\\n":
-        return "\n"
-    try:
-        return chr(ord(s))
-    except TypeError:
-        return s[1]
+def _unescape(l, s, start, end):
+    """Append ``s[start:end]`` to ``l`` with backslash escapes collapsed."""
+    pos = s.find('\\', start, end)
+    last = end - 1
+    while 0 <= pos < last:
+        l.append(s[start:pos])
+        # drop the backslash, along with the newline for line continuations
+        start = pos + 2 if s[pos + 1] == '\n' else pos + 1
+        pos = s.find('\\', pos + 2, end)
+    if start != end:
+        l.append(s[start:end])
+
+
+def native_var_template(val):
+    """Split ``val`` into literal text and the variable names it references.
+
+    :param val: string to split
+    :return: tuple alternating between literal text, with backslash escapes
+        collapsed, and variable names; it always starts and ends with
+        literal text.
+    """
+    l = []
+    if '$' not in val:
+        # nothing to interpolate, skip the regex entirely
+        if '\\' not in val:
+            return (val,)
+        _unescape(l, val, 0, len(val))
+        return (''.join(l),)
+
+    prev = 0
+    parts = []
+    for match in var_find.finditer(val):
+        pos = match.start()
+        if val[pos] == '\\':
+            # it's escaped, either it's \\$ or \\${; leave it in the
+            # literal chunk for backslash cleansing.
+            continue
+        # do \\ cleansing of the literal text while collapsing val down
+        _unescape(l, val, prev, pos)
+        parts.append(''.join(l))
+        l.clear()
+        parts.append(match.group(1).strip("${}"))
+        prev = match.end()
+
+    _unescape(l, val, prev, len(val))
+    parts.append(''.join(l))
+    return tuple(parts)
+
+
+try:
+    # No name "_bash" in module snakeoil
+    # pylint: disable=E0611
+    from ._bash import var_template
+    cpy_builtin = True
+except ImportError:
+    cpy_builtin = False
+    var_template = native_var_template
+
+# templates only depend on the string being expanded, so share them
+# between parsers since config files tend to repeat themselves
+_cached_var_template = lru_cache(maxsize=1024)(var_template)
+
+
+def _expand_template(parts, env):
+    if len(parts) == 1:
+        return parts[0]
+    l = list(parts)
+    for i in range(1, len(parts), 2):
+        var = parts[i]
+        if var in env:
+            value = env[var]
+            if not isinstance(value, str):
+                raise ValueError(
+                    "env key %r must be a string, not %s: %r" % (
+                        var, type(value), value))
+            l[i] = value
+        else:
+            l[i] = ''
+    return ''.join(l)
+
+
+def var_expand(val, env):
+    """Interpolate variables from ``env`` into ``val``, collapsing escapes.
+
+    :param val: string to expand
+    :param env: mapping to pull variable values from; unset variables
+        expand to an empty string
+    """
+    return _expand_template(var_template(val), env)
+
+
+_WORDCHARS = frozenset(shlex('', posix=True).wordchars + "@${}/.-+/:~^*")
+
+# shlex state changes that end a segment of the current token
+_SEGMENT_TRANSITIONS = frozenset(
+    (('"', 'a'), ('a', '"'), ('a', ' '), ("'", 'a')))
+
+
+class _SegmentTracker:
+    """Record token segments as a :py:class:`bash_parser` changes state.
+
+    Segments are stored as (state, end index) tuples, leaving slicing to
+    be done once the full token has been read.
+
+    Only assignment is intercepted; as this isn't a full data descriptor
+    reading the state falls through to the instance dict.
+    """
+
+    def __set__(self, parser, state):
+        d = parser.__dict__
+        if (d['state'], state) in _SEGMENT_TRANSITIONS:
+            strl = len(parser.token)
+            if parser._pos != strl:
+                parser.changed_state.append((d['state'], strl))
+            parser._pos = strl
+        d['state'] = state
 
 
 class bash_parser(shlex):
@@ -241,25 +354,37 @@ class bash_parser(shlex):
         """
         self.__dict__['state'] = ' '
         super().__init__(source, posix=True, infile=infile)
-        self.wordchars += "@${}/.-+/:~^*"
-        self.wordchars = frozenset(self.wordchars)
+        self.wordchars = _WORDCHARS
         if sourcing_command is not None:
             self.source = sourcing_command
         if env is None:
             env = {}
         self.env = env
-        self.__pos = 0
-
-    def __setattr__(self, attr, val):
-        if attr == "state":
-            if (self.state, val) in (
-                    ('"', 'a'), ('a', '"'), ('a', ' '), ("'", 'a')):
-                strl = len(self.token)
-                if self.__pos != strl:
-                    self.changed_state.append(
-                        (self.state, self.token[self.__pos:]))
-                self.__pos = strl
-        self.__dict__[attr] = val
+        self._pos = 0
+
+    state = _SegmentTracker()
+
+    def reset(self, source, env=None, infile=None):
+        """Rewind the parser to start reading from a new source.
+
+        This skips the setup cost of creating a new parser, which is
+        noticeable when parsing many small files in a row.  Note that
+        parsers aren't thread-safe; a parser must only be used by a single
+        thread at a time.
+
+        See :py:meth:`__init__` for parameter details.
+        """
+        self.instream = source
+        self.infile = infile
+        self.__dict__['state'] = ' '
+        self.pushback.clear()
+        self.filestack.clear()
+        self.lineno = 1
+        self.token = ''
+        if env is None:
+            env = {}
+        self.env = env
+        self._pos = 0
 
     def sourcehook(self, newfile):
         try:
@@ -269,61 +394,98 @@ class bash_parser(shlex):
 
     def read_token(self):
         self.changed_state = []
-        self.__pos = 0
+        self._pos = 0
         token = super().read_token()
         if token is None:
             return token
         if self.state is None:
             # eof reached.
-            self.changed_state.append((self.state, token[self.__pos:]))
-        else:
-            self.changed_state.append((self.state, self.token[self.__pos:]))
-        tok = ''
-        for s, t in self.changed_state:
+            self.changed_state.append((self.state, len(token)))
+        if self.changed_state and '$' not in token and '\\' not in token:
+            # nothing to expand, the segments would just be joined back up
+            return token
+        l = []
+        start = 0
+        for s, end in self.changed_state:
+            t = token[start:end]
             if s in ('"', "a"):
-                tok += self.var_expand(t).replace("\\\n", '')
+                t = self.var_expand(t)
+            l.append(t)
+            start = end
+        return ''.join(l)
+
+    def iter_assignments(self):
+        """Iterate over the variable assignments in the source.
+
+        Note that the env used for interpolation isn't updated; callers
+        should store each assignment before advancing the iterator.
+
+        :raise ValueError: thrown if invalid syntax is encountered.
+        :return: yields (key, value) tuples
+        """
+        get_token = partial(next, iter(self.get_token, None), None)
+        # tokens read while looking ahead, popped from the end
+        pending = []
+        while True:
+            key = pending.pop() if pending else get_token()
+            if key == 'export':
+                # discard 'export' token from "export VAR=VALUE" lines
+                key = pending.pop() if pending else get_token()
+            if key is None:
+                return
+            elif key.isspace():
+                # we specifically have to check this, since we're
+                # screwing with the whitespace filters below to
+                # detect empty assigns
+                continue
+            eq = pending.pop() if pending else get_token()
+            if eq != '=':
+                raise ValueError("got token %r, was expecting '='" % eq)
+            val = get_token()
+            if val is None:
+                val = ''
+            elif val == 'export':
+                val = get_token()
+            # look ahead to see if we just got an empty assign.
+            next_tok = get_token()
+            if next_tok == '=':
+                # ... we did, so the value is actually the next key.
+                pending.append(next_tok)
+                pending.append(val)
+                val = ''
             else:
-                tok += t
-        return tok
+                pending.append(next_tok)
+            yield key, val
 
     def var_expand(self, val):
-        prev, pos = 0, 0
-        l = []
-        while match := var_find.search(val, pos):
-            pos = match.start()
-            if val[pos] == '\\':
-                # it's escaped. either it's \\$ or \\${ , either way,
-                # skipping two ahead handles it.
-                pos += 2
-            else:
-                var = val[match.start():match.end()].strip("${}")
-                if prev != pos:
-                    l.append(val[prev:pos])
-                if var in self.env:
-                    if not isinstance(self.env[var], str):
-                        raise ValueError(
-                            "env key %r must be a string, not %s: %r" % (
-                                var, type(self.env[var]), self.env[var]))
-                    l.append(self.env[var])
-                else:
-                    l.append("")
-                prev = pos = match.end()
+        if '$' not in val and '\\' not in val:
+            return val
+        return _expand_template(_cached_var_template(val), self.env)
+
 
-        # do \\ cleansing, collapsing val down also.
-        val = backslash_find.sub(_nuke_backslash, ''.join(l) + val[prev:])
-        return val
+class _ParserPool(threading.local):
+    """Idle parsers kept for reuse by read_bash_dict, keyed by sourcing command.
+
+    Parsers are removed from the pool while in use, so nested or concurrent
+    calls never share one.
+    """
+
+    def __init__(self):
+        self.parsers = {}
+
+
+_parser_pool = _ParserPool()
 
 
 class BashParseError(Exception):
     """Exception thrown when a handle being parsed isn't valid bash."""
 
     def __init__(self, filename, line, errmsg=None):
-        if errmsg is not None:
-            super().__init__(
-                "error parsing '%s' on or before line %i: err %s" %
-                (filename, line, errmsg))
-        else:
-            super().__init__(
-                "error parsing '%s' on or before line %i" %
-                (filename, line))
+        super().__init__(filename, line, errmsg)
         self.file, self.line, self.errmsg = filename, line, errmsg
+
+    def __str__(self):
+        msg = f"error parsing '{self.file}' on or before line {self.line}"
+        if self.errmsg is not None:
+            msg += f": err {self.errmsg}"
+        return msg
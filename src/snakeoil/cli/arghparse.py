@@ -1,23 +1,17 @@
 """Various argparse actions, types, and miscellaneous extensions."""
 
 import argparse
-import copy
 import importlib
 import logging
 import os
-import pkgutil
-import subprocess
+import re
 import sys
-import traceback
 from argparse import (_UNRECOGNIZED_ARGS_ATTR, OPTIONAL, PARSER, REMAINDER, SUPPRESS, ZERO_OR_MORE,
                       ArgumentError, _, _get_action_name, _SubParsersAction)
-from collections import Counter
-from functools import partial
+from bisect import bisect_left
+from functools import partial, wraps
 from itertools import chain
 from operator import attrgetter
-from textwrap import dedent
-
-import lazy_object_proxy
 
 from .. import klass
 from ..mappings import ImmutableDict
@@ -31,12 +25,31 @@ from ..version import get_version
 _generate_docs = False
 
 
-@klass.patch('argparse.ArgumentParser.add_subparsers')
-@klass.patch('argparse._SubParsersAction.add_parser')
-@klass.patch('argparse._ActionsContainer.add_mutually_exclusive_group')
-@klass.patch('argparse._ActionsContainer.add_argument_group')
-@klass.patch('argparse._ActionsContainer.add_argument')
-def _add_argument_docs(orig_func, self, *args, **kwargs):
+def _add_docs(orig_func, self, obj, docs):
+    """Replace summarized help with extended docs for generated documentation."""
+    from textwrap import dedent
+    if isinstance(docs, (list, tuple)):
+        # list args are often used if originator wanted to strip
+        # off first description summary line
+        docs = '\n'.join(docs)
+    docs = '\n'.join(dedent(docs).strip().split('\n'))
+
+    if orig_func.__name__ == 'add_subparsers':
+        # store original description before overriding it with extended
+        # docs for general subparsers argument groups
+        self._subparsers._description = self._subparsers.description
+        self._subparsers.description = docs
+    elif isinstance(obj, argparse.Action):
+        # docs override help for regular arguments
+        obj.help = docs
+    elif isinstance(obj, argparse._ActionsContainer):
+        # store original description before overriding it with extended
+        # docs for argument groups
+        obj._description = obj.description
+        obj.description = docs
+
+
+def _add_argument_docs(orig_func):
     """Enable docs keyword argument support for argparse arguments.
 
     This is used to add extended, rST-formatted docs to man pages (or other
@@ -48,43 +61,41 @@ def _add_argument_docs(orig_func, self, *args, **kwargs):
     enable the global _generate_docs variable in order to replace the
     summarized help strings with the extended doc strings.
     """
-    docs = kwargs.pop('docs', None)
-    obj = orig_func(self, *args, **kwargs)
-    if _generate_docs and docs is not None:
-        if isinstance(docs, (list, tuple)):
-            # list args are often used if originator wanted to strip
-            # off first description summary line
-            docs = '\n'.join(docs)
-        docs = '\n'.join(dedent(docs).strip().split('\n'))
-
-        if orig_func.__name__ == 'add_subparsers':
-            # store original description before overriding it with extended
-            # docs for general subparsers argument groups
-            self._subparsers._description = self._subparsers.description
-            self._subparsers.description = docs
-        elif isinstance(obj, argparse.Action):
-            # docs override help for regular arguments
-            obj.help = docs
-        elif isinstance(obj, argparse._ActionsContainer):
-            # store original description before overriding it with extended
-            # docs for argument groups
-            obj._description = obj.description
-            obj.description = docs
-    return obj
+    @wraps(orig_func)
+    def wrapper(self, *args, **kwargs):
+        docs = kwargs.pop('docs', None)
+        obj = orig_func(self, *args, **kwargs)
+        # regular, non-doc generation usage only needs the keyword discarded
+        if _generate_docs and docs is not None:
+            _add_docs(orig_func, self, obj, docs)
+        return obj
+    return wrapper
+
+
+for _cls, _attr in (
+        (argparse.ArgumentParser, 'add_subparsers'),
+        (argparse._SubParsersAction, 'add_parser'),
+        (argparse._ActionsContainer, 'add_mutually_exclusive_group'),
+        (argparse._ActionsContainer, 'add_argument_group'),
+        (argparse._ActionsContainer, 'add_argument')):
+    setattr(_cls, _attr, _add_argument_docs(getattr(_cls, _attr)))
+del _cls, _attr
 
 
 def _ensure_value(namespace, name, value):
     """Force empty namespace attribute to specified value."""
-    if getattr(namespace, name, None) is None:
+    current = getattr(namespace, name, None)
+    if current is None:
         setattr(namespace, name, value)
-    return getattr(namespace, name)
+        return value
+    return current
 
 
 class ExtendAction(argparse._AppendAction):
     """Force multiple values to always be stored in a flat list."""
 
     def __call__(self, parser, namespace, values, option_string=None):
-        items = copy.copy(_ensure_value(namespace, self.dest, []))
+        items = list(_ensure_value(namespace, self.dest, []))
         items.extend(values)
         setattr(namespace, self.dest, items)
 
@@ -124,7 +135,8 @@ class ParseStdin(ExtendAction):
         if values is not None and len(values) == 1 and values[0] == '-':
             if sys.stdin.isatty():
                 raise argparse.ArgumentError(self, "'-' is only valid when piping data in")
-            values = [x.rstrip() for x in sys.stdin.readlines() if self.filter_func(x)]
+            filter_func = self.filter_func
+            values = [x.rstrip() for x in sys.stdin if filter_func(x)]
             # reassign stdin to allow interactivity (currently only works for unix)
             sys.stdin = open('/dev/tty')
         super().__call__(parser, namespace, values, option_string)
@@ -134,12 +146,11 @@ class CommaSeparatedValues(argparse._AppendAction):
     """Split comma-separated values into a list."""
 
     def parse_values(self, values):
-        items = []
         if isinstance(values, str):
-            items.extend(x for x in values.split(',') if x)
-        else:
-            for value in values:
-                items.extend(x for x in value.split(',') if x)
+            return list(filter(None, values.split(',')))
+        items = []
+        for value in values:
+            items.extend(filter(None, value.split(',')))
         return items
 
     def __call__(self, parser, namespace, values, option_string=None):
@@ -174,7 +185,7 @@ class CommaSeparatedNegations(argparse._AppendAction):
             values = [values]
         for value in values:
             try:
-                neg, pos = split_negations(x for x in value.split(',') if x)
+                neg, pos = split_negations(filter(None, value.split(',')))
             except ValueError as e:
                 raise argparse.ArgumentTypeError(e)
             disabled.extend(neg)
@@ -200,10 +211,9 @@ class CommaSeparatedNegationsAppend(CommaSeparatedNegations):
     """
 
     def __call__(self, parser, namespace, values, option_string=None):
-        old = copy.copy(_ensure_value(namespace, self.dest, ([], [])))
-        new = self.parse_values(values)
-        combined = tuple(o + n for o, n in zip(old, new))
-        setattr(namespace, self.dest, combined)
+        disabled, enabled = _ensure_value(namespace, self.dest, ([], []))
+        new_disabled, new_enabled = self.parse_values(values)
+        setattr(namespace, self.dest, (disabled + new_disabled, enabled + new_enabled))
 
 
 class CommaSeparatedElements(argparse._AppendAction):
@@ -222,7 +232,7 @@ class CommaSeparatedElements(argparse._AppendAction):
             values = [values]
         for value in values:
             try:
-                neg, neu, pos = split_elements(x for x in value.split(',') if x)
+                neg, neu, pos = split_elements(filter(None, value.split(',')))
             except ValueError as e:
                 raise argparse.ArgumentTypeError(e)
             disabled.extend(neg)
@@ -250,9 +260,9 @@ class CommaSeparatedElementsAppend(CommaSeparatedElements):
     """
 
     def __call__(self, parser, namespace, values, option_string=None):
-        old = copy.copy(_ensure_value(namespace, self.dest, ([], [], [])))
-        new = self.parse_values(values)
-        combined = tuple(o + n for o, n in zip(old, new))
+        disabled, neutral, enabled = _ensure_value(namespace, self.dest, ([], [], []))
+        new_disabled, new_neutral, new_enabled = self.parse_values(values)
+        combined = (disabled + new_disabled, neutral + new_neutral, enabled + new_enabled)
         setattr(namespace, self.dest, combined)
 
 
@@ -266,6 +276,7 @@ class ManHelpAction(argparse._HelpAction):
             # running `pinspect profile --help` tries to open pinspect-profile
             # man page, but `pinspect profile masks --help` also tries to open
             # pinspect-profile.
+            import subprocess
             man_page = '-'.join(parser.prog.split()[:2])
             p = subprocess.Popen(['man', man_page], stderr=subprocess.DEVNULL)
             p.communicate()
@@ -278,6 +289,19 @@ class ManHelpAction(argparse._HelpAction):
         parser.exit()
 
 
+class Version(argparse._VersionAction):
+    """Display version info, only determining it when the option is used.
+
+    Version retrieval can spawn git processes so it's deferred until the
+    action is actually triggered instead of running for every parser.
+    """
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        if callable(self.version):
+            self.version = self.version()
+        super().__call__(parser, namespace, values, option_string)
+
+
 class StoreBool(argparse._StoreAction):
 
     def __init__(self,
@@ -300,12 +324,15 @@ class StoreBool(argparse._StoreAction):
             help=help,
             metavar=metavar)
 
-    @staticmethod
-    def boolean(value):
+    _true_values = frozenset(('y', 'yes', 'true', '1'))
+    _false_values = frozenset(('n', 'no', 'false', '0'))
+
+    @classmethod
+    def boolean(cls, value):
         value = value.lower()
-        if value in ('y', 'yes', 'true', '1'):
+        if value in cls._true_values:
             return True
-        elif value in ('n', 'no', 'false', '0'):
+        elif value in cls._false_values:
             return False
         raise ValueError("value %r must be [y|yes|true|1|n|no|false|0]" % (value,))
 
@@ -344,6 +371,8 @@ class Verbosity(argparse.Action):
 
 class DelayedValue:
 
+    __slots__ = ('priority', 'invokable')
+
     def __init__(self, invokable, priority=0):
         self.priority = priority
         if not callable(invokable):
@@ -356,6 +385,8 @@ class DelayedValue:
 
 class DelayedDefault(DelayedValue):
 
+    __slots__ = ()
+
     @classmethod
     def wipe(cls, attrs, priority):
         if isinstance(attrs, str):
@@ -377,12 +408,16 @@ class DelayedDefault(DelayedValue):
 
 class DelayedParse(DelayedValue):
 
+    __slots__ = ()
+
     def __call__(self, namespace, attr):
         self.invokable()
 
 
 class OrderedParse(DelayedValue):
 
+    __slots__ = ()
+
     def __call__(self, namespace, attr):
         self.invokable(namespace)
         delattr(namespace, attr)
@@ -426,21 +461,18 @@ class Expansion(argparse.Action):
             default=False,
             nargs=nargs)
         self.subst = tuple(subst)
+        self._subst = tuple((chunk[0], chunk[1:]) for chunk in self.subst)
 
     def __call__(self, parser, namespace, values, option_string=None):
-        actions = parser._actions
-        action_map = {}
+        # argparse already maintains the option string to action mapping
+        action_map = parser._option_string_actions
         vals = values
         if isinstance(values, str):
             vals = [vals]
         dvals = {str(idx): val for idx, val in enumerate(vals)}
         dvals['*'] = ' '.join(vals)
 
-        for action in actions:
-            action_map.update((option, action) for option in action.option_strings)
-
-        for chunk in self.subst:
-            option, args = chunk[0], chunk[1:]
+        for option, args in self._subst:
             action = action_map.get(option)
             args = [x % dvals for x in args]
             if not action:
@@ -485,6 +517,7 @@ class _SubParser(argparse._SubParsersAction):
 
         Note that this assumes a specific module naming and layout scheme for commands.
         """
+        import lazy_object_proxy
         prog = self._prog_prefix
         module = f'{prog}.scripts.{prog}_{subcmd}'
         func = partial(self._lazy_parser, module, subcmd)
@@ -504,9 +537,8 @@ class _SubParser(argparse._SubParsersAction):
             setattr(namespace, self.dest, parser_name)
 
         # select the parser
-        try:
-            parser = self._name_parser_map[parser_name]
-        except KeyError:
+        parser = self._name_parser_map.get(parser_name)
+        if parser is None:
             tup = parser_name, ', '.join(self._name_parser_map)
             msg = _('unknown parser %r (choices: %s)') % tup
             raise argparse.ArgumentError(self, msg)
@@ -539,8 +571,11 @@ class CsvHelpFormatter(argparse.HelpFormatter):
 class SortedHelpFormatter(CsvHelpFormatter):
     """Help formatter that sorts arguments by option strings."""
 
+    _sort_key = attrgetter('option_strings')
+
     def add_arguments(self, actions):
-        actions = sorted(actions, key=attrgetter('option_strings'))
+        if len(actions) > 1:
+            actions = sorted(actions, key=self._sort_key)
         super().add_arguments(actions)
 
 
@@ -557,11 +592,12 @@ class Namespace(argparse.Namespace):
             raise
 
     def __getattribute__(self, name):
-        val = super().__getattribute__(name)
+        # argparse.Namespace doesn't override attribute lookup so skip super()
+        val = object.__getattribute__(self, name)
         # collapse any delayed values accessed before arg parsing occurs
         if isinstance(val, DelayedValue):
             val(self, name)
-            val = super().__getattribute__(name)
+            val = object.__getattribute__(self, name)
         return val
 
     def __bool__(self):
@@ -572,6 +608,17 @@ class Namespace(argparse.Namespace):
 class SubcmdAbbrevArgumentParser(argparse.ArgumentParser):
     """Argparse-compatible argument parser that supports abbreviating subcommands."""
 
+    @staticmethod
+    def _subcmd_matches(action, prefix):
+        """Return up to two subcommands of an action starting with a given prefix."""
+        # subcommands are kept sorted so matches are found via binary search,
+        # the cache is refreshed if subcommands are added
+        choices = getattr(action, '_sorted_choices', None)
+        if choices is None or len(choices) != len(action.choices):
+            choices = action._sorted_choices = sorted(action.choices)
+        i = bisect_left(choices, prefix)
+        return [x for x in choices[i:i + 2] if x.startswith(prefix)]
+
     def _get_values(self, action, arg_strings):
         # for everything but PARSER, REMAINDER args, strip out first '--'
         if action.nargs not in [PARSER, REMAINDER]:
@@ -615,7 +662,7 @@ class SubcmdAbbrevArgumentParser(argparse.ArgumentParser):
             value = [self._get_value(action, v) for v in arg_strings]
             # allow subcmd abbreviations for unique matches
             if value[0] not in action.choices:
-                cmds = [x for x in action.choices if x.startswith(value[0])]
+                cmds = self._subcmd_matches(action, value[0])
                 if len(cmds) == 1:
                     value[0] = cmds[0]
             self._check_value(action, value[0])
@@ -656,24 +703,50 @@ class OptionalsParser(argparse.ArgumentParser):
         if namespace is None:
             namespace = Namespace()
 
-        # add any action defaults that aren't present
+        # add any action and parser defaults that aren't present
+        self._add_defaults(namespace)
+
+        # parse the arguments and exit if there are any errors
+        try:
+            return self._parse_optionals(args, namespace)
+        except ArgumentError:
+            err = sys.exc_info()[1]
+            self.error(str(err))
+
+    def _add_defaults(self, namespace):
+        """Add any action and parser defaults that aren't present in a namespace."""
         for action in self._actions:
             if action.dest is not SUPPRESS:
                 if not hasattr(namespace, action.dest):
                     if action.default is not SUPPRESS:
                         setattr(namespace, action.dest, action.default)
 
-        # add any parser defaults that aren't present
-        for dest in self._defaults:
+        for dest, default in self._defaults.items():
             if not hasattr(namespace, dest):
-                setattr(namespace, dest, self._defaults[dest])
+                setattr(namespace, dest, default)
 
-        # parse the arguments and exit if there are any errors
-        try:
-            return self._parse_optionals(args, namespace)
-        except ArgumentError:
-            err = sys.exc_info()[1]
-            self.error(str(err))
+    def _get_action_conflicts(self):
+        """Map mutually exclusive arguments to the arguments they conflict with.
+
+        The mapping is cached until the mutually exclusive groups change.
+        """
+        groups = self._mutually_exclusive_groups
+        # key on the grouped actions themselves since they can be replaced
+        # in place, e.g. via conflict resolution
+        key = tuple(tuple(group._group_actions) for group in groups)
+        cached = self.__dict__.get('_action_conflicts')
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        action_conflicts = {}
+        for mutex_group in groups:
+            group_actions = mutex_group._group_actions
+            for i, mutex_action in enumerate(group_actions):
+                conflicts = action_conflicts.setdefault(mutex_action, [])
+                conflicts.extend(group_actions[:i])
+                conflicts.extend(group_actions[i + 1:])
+        self._action_conflicts = (key, action_conflicts)
+        return action_conflicts
 
     def _parse_optionals(self, arg_strings, namespace):
         # replace arg strings that are file references
@@ -682,38 +755,50 @@ class OptionalsParser(argparse.ArgumentParser):
 
         # map all mutually exclusive arguments to the other arguments
         # they can't occur with
-        action_conflicts = {}
-        for mutex_group in self._mutually_exclusive_groups:
-            group_actions = mutex_group._group_actions
-            for i, mutex_action in enumerate(mutex_group._group_actions):
-                conflicts = action_conflicts.setdefault(mutex_action, [])
-                conflicts.extend(group_actions[:i])
-                conflicts.extend(group_actions[i + 1:])
+        get_conflicts = self._get_action_conflicts().get
 
         # find all option indices, and determine the arg_string_pattern
         # which has an 'O' if there is an option at an index,
         # an 'A' if there is an argument, or a '-' if there is a '--'
         option_string_indices = {}
         arg_string_pattern_parts = []
-        arg_strings_iter = iter(arg_strings)
-        for i, arg_string in enumerate(arg_strings_iter):
+        # parser options don't change during a parse run so repeated args
+        # reuse their previous results
+        parsed_optionals = {}
+        parse_optional = self._parse_optional
+        optionals_map = self._option_string_actions
+        prefix_chars = self.prefix_chars
+        for i, arg_string in enumerate(arg_strings):
 
             # all args after -- are non-options
             if arg_string == '--':
-                arg_string_pattern_parts.append('-')
-                for arg_string in arg_strings_iter:
-                    arg_string_pattern_parts.append('A')
+                arg_string_pattern_parts.append('-' + 'A' * (len(arg_strings) - i - 1))
+                break
 
             # otherwise, add the arg to the arg strings
             # and note the index if it was an option
+            option_string, sep, explicit_arg = arg_string.partition('=')
+            if arg_string[:1] in prefix_chars and option_string in optionals_map:
+                # Known option strings as is or with explicit args that start
+                # with one of this parser's prefix chars are resolved directly,
+                # matching _parse_optional() which checks them first. Note that
+                # this skips any subclass overrides of _parse_optional().
+                if not sep:
+                    explicit_arg = None
+                elif arg_string in optionals_map:
+                    option_string, explicit_arg = arg_string, None
+                option_tuple = (optionals_map[option_string], option_string, explicit_arg)
             else:
-                option_tuple = self._parse_optional(arg_string)
-                if option_tuple is None:
-                    pattern = 'A'
-                else:
-                    option_string_indices[i] = option_tuple
-                    pattern = 'O'
-                arg_string_pattern_parts.append(pattern)
+                try:
+                    option_tuple = parsed_optionals[arg_string]
+                except KeyError:
+                    option_tuple = parsed_optionals[arg_string] = parse_optional(arg_string)
+            if option_tuple is None:
+                pattern = 'A'
+            else:
+                option_string_indices[i] = option_tuple
+                pattern = 'O'
+            arg_string_pattern_parts.append(pattern)
 
         # join the pieces together to form the pattern
         arg_strings_pattern = ''.join(arg_string_pattern_parts)
@@ -731,7 +816,7 @@ class OptionalsParser(argparse.ArgumentParser):
             # value don't really count as "present"
             if argument_values is not action.default:
                 seen_non_default_actions.add(action)
-                for conflict_action in action_conflicts.get(action, []):
+                for conflict_action in get_conflicts(action, ()):
                     if conflict_action in seen_non_default_actions:
                         msg = _('not allowed with argument %s')
                         action_name = _get_action_name(conflict_action)
@@ -742,28 +827,59 @@ class OptionalsParser(argparse.ArgumentParser):
             if argument_values is not SUPPRESS:
                 action(self, namespace, argument_values, option_string)
 
+        # Matching an action with a fixed number of args only depends on that
+        # many pattern chars from the starting index, so only those are
+        # sliced off and used to cache results for repeated options. Other
+        # actions are matched in place using their compiled nargs patterns.
+        matched_args = {}
+        nargs_patterns = {}
+
+        def match_argument(action, pattern, start=0):
+            nargs = action.nargs
+            if nargs is None or nargs == OPTIONAL:
+                pattern = pattern[start:start + 1]
+            elif isinstance(nargs, int):
+                pattern = pattern[start:start + nargs]
+            else:
+                try:
+                    nargs_re = nargs_patterns[action]
+                except KeyError:
+                    nargs_re = re.compile(self._get_nargs_pattern(action))
+                    nargs_patterns[action] = nargs_re
+                if (match := nargs_re.match(pattern, start)) is not None:
+                    return len(match.group(1))
+                # fallback to regular matching to raise the related error
+                return self._match_argument(action, pattern[start:])
+            key = (action, pattern)
+            try:
+                return matched_args[key]
+            except KeyError:
+                arg_count = self._match_argument(action, pattern)
+                matched_args[key] = arg_count
+                return arg_count
+
         # function to convert arg_strings into an optional action
         def consume_optional(start_index):
 
             # get the optional identified at this index
             option_tuple = option_string_indices[start_index]
             action, option_string, explicit_arg = option_tuple
+            arg_string = arg_strings[start_index]
 
             # identify additional optionals in the same arg string
             # (e.g. -xyz is the same as -x -y -z if no args are required)
-            match_argument = self._match_argument
             action_tuples = []
             while True:
 
                 # if we found no optional action, skip it
                 if action is None:
-                    extras.append(arg_strings[start_index])
+                    extras.append(arg_string)
                     return start_index + 1
 
                 # if we match help options, skip them for now so subparsers
                 # show up in the help output
-                if arg_strings[start_index] in ('-h', '--help'):
-                    extras.append(arg_strings[start_index])
+                if arg_string in ('-h', '--help'):
+                    extras.append(arg_string)
                     return start_index + 1
 
                 # if there is an explicit argument, try to match the
@@ -774,13 +890,11 @@ class OptionalsParser(argparse.ArgumentParser):
                     # if the action is a single-dash option and takes no
                     # arguments, try to parse more single-dash options out
                     # of the tail of the option string
-                    chars = self.prefix_chars
-                    if arg_count == 0 and option_string[1] not in chars:
+                    if arg_count == 0 and option_string[1] not in prefix_chars:
                         action_tuples.append((action, [], option_string))
                         char = option_string[0]
                         option_string = char + explicit_arg[0]
                         new_explicit_arg = explicit_arg[1:] or None
-                        optionals_map = self._option_string_actions
                         if option_string in optionals_map:
                             action = optionals_map[option_string]
                             explicit_arg = new_explicit_arg
@@ -807,8 +921,7 @@ class OptionalsParser(argparse.ArgumentParser):
                 # if successful, exit the loop
                 else:
                     start = start_index + 1
-                    selected_patterns = arg_strings_pattern[start:]
-                    arg_count = match_argument(action, selected_patterns)
+                    arg_count = match_argument(action, arg_strings_pattern, start)
                     stop = start + arg_count
                     args = arg_strings[start:stop]
                     action_tuples.append((action, args, option_string))
@@ -848,17 +961,20 @@ class OptionalsParser(argparse.ArgumentParser):
         # passed the last option string
         extras = []
         start_index = 0
-        if option_string_indices:
-            max_option_string_index = max(option_string_indices)
+        # option indices are added in ascending order, so the next option
+        # index can be found by advancing a cursor instead of rescanning
+        option_indices = list(option_string_indices)
+        option_cursor = 0
+        if option_indices:
+            max_option_string_index = option_indices[-1]
         else:
             max_option_string_index = -1
         while start_index <= max_option_string_index:
 
             # consume any Positionals preceding the next option
-            next_option_string_index = min([
-                index
-                for index in option_string_indices
-                if index >= start_index])
+            while option_indices[option_cursor] < start_index:
+                option_cursor += 1
+            next_option_string_index = option_indices[option_cursor]
             if start_index != next_option_string_index:
                 # positionals_end_index = consume_positionals(start_index)
                 positionals_end_index = start_index
@@ -894,20 +1010,18 @@ class OptionalsParser(argparse.ArgumentParser):
         for action in self._actions:
             if action not in seen_actions:
                 # ignore required subcommands and positionals as they'll be handled later
-                skip = not action.option_strings or isinstance(action, _SubParsersAction)
-                if action.required and not skip:
+                if (action.required and action.option_strings and
+                        not isinstance(action, _SubParsersAction)):
                     required_actions.append(_get_action_name(action))
                 else:
                     # Convert action default now instead of doing it before
                     # parsing arguments to avoid calling convert functions
                     # twice (which may fail) if the argument was given, but
                     # only if it was defined already in the namespace
-                    if (action.default is not None and
-                        isinstance(action.default, str) and
-                        hasattr(namespace, action.dest) and
-                        action.default is getattr(namespace, action.dest)):
-                        setattr(namespace, action.dest,
-                                self._get_value(action, action.default))
+                    default = action.default
+                    if (isinstance(default, str) and
+                            getattr(namespace, action.dest, None) is default):
+                        setattr(namespace, action.dest, self._get_value(action, default))
 
         if required_actions:
             self.error(_('the following arguments are required: %s') %
@@ -935,14 +1049,23 @@ class OptionalsParser(argparse.ArgumentParser):
 class CsvActionsParser(argparse.ArgumentParser):
     """Parser with custom, CSV actions registered for usage."""
 
+    _csv_actions = ImmutableDict({
+        'csv': CommaSeparatedValues,
+        'csv_append': CommaSeparatedValuesAppend,
+        'csv_negations': CommaSeparatedNegations,
+        'csv_negations_append': CommaSeparatedNegationsAppend,
+        'csv_elements': CommaSeparatedElements,
+        'csv_elements_append': CommaSeparatedElementsAppend,
+    })
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.register('action', 'csv', CommaSeparatedValues)
-        self.register('action', 'csv_append', CommaSeparatedValuesAppend)
-        self.register('action', 'csv_negations', CommaSeparatedNegations)
-        self.register('action', 'csv_negations_append', CommaSeparatedNegationsAppend)
-        self.register('action', 'csv_elements', CommaSeparatedElements)
-        self.register('action', 'csv_elements_append', CommaSeparatedElementsAppend)
+        self._registries['action'].update(self._csv_actions)
+
+
+def _stdout_isatty(namespace, attr):
+    """Default to enabling color when stdout is a terminal at parse time."""
+    setattr(namespace, attr, sys.stdout.isatty())
 
 
 class ArgumentParser(OptionalsParser, CsvActionsParser):
@@ -950,18 +1073,12 @@ class ArgumentParser(OptionalsParser, CsvActionsParser):
 
     def __init__(self, suppress=False, subcmds=False, color=True, debug=True, quiet=True,
                  verbose=True, version=True, add_help=True, sorted_help=False,
-                 description=None, docs=None, script=None, prog=None, **kwargs):
-        self.debug = debug and '--debug' in sys.argv[1:]
-        self.verbosity = int(verbose)
-        if self.verbosity:
-            argv = Counter(sys.argv[1:])
-            # Only supports single, short opts (i.e. -vv isn't recognized),
-            # post argparsing the proper value supporting those kind of args is
-            # in the options namespace.
-            self.verbosity = sum(chain.from_iterable((
-                (-1 for x in range(argv['-q'] + argv['--quiet'])),
-                (1 for x in range(argv['-v'] + argv['--verbose'])),
-            )))
+                 description=None, docs=None, script=None, prog=None, argv=None, **kwargs):
+        # Command line args used to determine early debug and verbosity
+        # settings before argparsing occurs, defaulting to the system args.
+        self._argv = argv
+        self._debug = debug
+        self._verbose = verbose
 
         # subparsers action object from calling add_subparsers()
         self.__subparsers = None
@@ -1025,8 +1142,8 @@ class ArgumentParser(OptionalsParser, CsvActionsParser):
                 # Note that this option will currently only be available on the
                 # base command, not on subcommands.
                 base_opts.add_argument(
-                    '--version', action='version',
-                    version=get_version(project, script_path),
+                    '--version', action=Version,
+                    version=partial(get_version, project, script_path),
                     help="show this program's version info and exit",
                     docs="""
                         Show this program's version information and exit.
@@ -1052,7 +1169,7 @@ class ArgumentParser(OptionalsParser, CsvActionsParser):
             if color:
                 base_opts.add_argument(
                     '--color', action=StoreBool,
-                    default=sys.stdout.isatty(),
+                    default=DelayedValue(_stdout_isatty),
                     help='enable/disable color support',
                     docs="""
                         Toggle colored output support. This can be used to forcibly
@@ -1062,6 +1179,7 @@ class ArgumentParser(OptionalsParser, CsvActionsParser):
 
         # register existing subcommands
         if subcmds:
+            import pkgutil
             prefix = f'{prog}.scripts.{prog}_'
             if subcmd_modules := [
                     name[len(prefix):] for _, name, _ in
@@ -1089,6 +1207,32 @@ class ArgumentParser(OptionalsParser, CsvActionsParser):
         self.description = description
         return description
 
+    @property
+    def _early_argv(self):
+        return sys.argv[1:] if self._argv is None else self._argv
+
+    @klass.cached_property
+    def debug(self):
+        """Debug status determined from the command line args before argparsing."""
+        return bool(self._debug) and '--debug' in self._early_argv
+
+    @klass.cached_property
+    def verbosity(self):
+        """Verbosity determined from the command line args before argparsing.
+
+        Only supports single, short opts (i.e. -vv isn't recognized), post
+        argparsing the proper value supporting those kind of args is in the
+        options namespace.
+        """
+        verbosity = 0
+        if self._verbose:
+            for arg in self._early_argv:
+                if arg == '-v' or arg == '--verbose':
+                    verbosity += 1
+                elif arg == '-q' or arg == '--quiet':
+                    verbosity -= 1
+        return verbosity
+
     @klass.cached_property
     def parsers(self):
         """Return the ordered sequence of inherited parsers."""
@@ -1142,17 +1286,8 @@ class ArgumentParser(OptionalsParser, CsvActionsParser):
         # run registered pre-parse functions
         namespace = self.pre_parse(namespace)
 
-        # add any action defaults that aren't present
-        for action in self._actions:
-            if action.dest is not SUPPRESS:
-                if not hasattr(namespace, action.dest):
-                    if action.default is not SUPPRESS:
-                        setattr(namespace, action.dest, action.default)
-
-        # add any parser defaults that aren't present
-        for dest in self._defaults:
-            if not hasattr(namespace, dest):
-                setattr(namespace, dest, self._defaults[dest])
+        # add any action and parser defaults that aren't present
+        self._add_defaults(namespace)
 
         try:
             # run registered early parse functions from all parsers
@@ -1198,16 +1333,20 @@ class ArgumentParser(OptionalsParser, CsvActionsParser):
         # intentionally no protection of suppression code; this should
         # just work.
 
-        i = ((attr, val) for attr, val in args.__dict__.items()
-             if isinstance(val, DelayedDefault))
-        for attr, functor in sorted(i, key=lambda val: val[1].priority):
-            functor(args, attr)
+        delayed_values = [
+            (attr, val) for attr, val in args.__dict__.items()
+            if isinstance(val, DelayedValue)]
+        if delayed_defaults := [x for x in delayed_values if isinstance(x[1], DelayedDefault)]:
+            for attr, functor in sorted(delayed_defaults, key=lambda val: val[1].priority):
+                functor(args, attr)
+            # rescan since delayed defaults can alter the namespace
+            delayed_values = [
+                (attr, val) for attr, val in args.__dict__.items()
+                if isinstance(val, DelayedValue)]
 
         # now run the delays
-        i = ((attr, val) for attr, val in args.__dict__.items()
-             if isinstance(val, DelayedValue))
         try:
-            for attr, delayed in sorted(i, key=lambda val: val[1].priority):
+            for attr, delayed in sorted(delayed_values, key=lambda val: val[1].priority):
                 delayed(args, attr)
         except (TypeError, ValueError) as e:
             raise TypeError("failed loading/parsing '%s': %s" % (attr, str(e))) from e
@@ -1231,6 +1370,7 @@ class ArgumentParser(OptionalsParser, CsvActionsParser):
         """
         if self.debug and sys.exc_info() != (None, None, None):
             # output traceback if any exception is on the stack
+            import traceback
             traceback.print_exc()
         self.exit(status, '%s: error: %s\n' % (self.prog, message))
 
@@ -124,6 +124,126 @@ class TestOptionalsParser:
         assert args.opt1 is None
         assert unknown == ['arg', '--opt1', 'yes']
 
+    def test_nargs(self):
+        self.optionals_parser.add_argument('-a', nargs='?', const='const')
+        self.optionals_parser.add_argument('-b', nargs=2)
+        self.optionals_parser.add_argument('-c', nargs='*')
+        self.optionals_parser.add_argument('-d')
+        parse = self.optionals_parser.parse_known_optionals
+
+        args, unknown = parse(['-a', '-b', '1', '2', '-c', '3', '4', '-d=5', '-a', 'x'])
+        assert (args.a, args.b, args.c, args.d) == ('x', ['1', '2'], ['3', '4'], '5')
+        assert unknown == []
+        args, unknown = parse(['-d', '1', '-d=2', '-d=', '-d3'])
+        assert args.d == '3'
+        args, unknown = parse(['-d='])
+        assert args.d == ''
+        args, unknown = parse(['-b', '1', '2', '-b', '3', '4', '-a', '-c'])
+        assert (args.a, args.b, args.c) == ('const', ['3', '4'], [])
+        with pytest.raises(argparse_helpers.Error, match='expected 2 arguments'):
+            parse(['-b', '1', '-a'])
+
+        self.optionals_parser.add_argument('-e', nargs='+')
+        args, unknown = parse(['-e', '1', '2', '-c', '-e', '3'])
+        assert (args.c, args.e) == ([], ['3'])
+        with pytest.raises(argparse_helpers.Error, match='expected at least one argument'):
+            parse(['-e', '-c'])
+
+    def test_inherited_prefix_chars(self):
+        # options inherited from parents using other prefix chars are positionals
+        parent = argparse.ArgumentParser(prefix_chars='+', add_help=False)
+        parent.add_argument('+f', action='store_true')
+        parser = argparse_helpers.mangle_parser(arghparse.OptionalsParser(parents=[parent]))
+        args, unknown = parser.parse_known_optionals(['+f'])
+        assert args.f is False
+        assert unknown == ['+f']
+        args, unknown = parser.parse_known_optionals(['+f=x'])
+        assert args.f is False
+        assert unknown == ['+f=x']
+
+    def test_defaults(self):
+        self.optionals_parser.add_argument('--opt1', default='a')
+        parse = self.optionals_parser.parse_known_optionals
+        args, _ = parse([])
+        assert args.opt1 == 'a'
+
+        # altered defaults and newly added arguments are respected
+        self.optionals_parser.set_defaults(opt1='b', foo='bar')
+        self.optionals_parser.add_argument('--opt2', default='c')
+        args, _ = parse([])
+        assert vars(args) == {'opt1': 'b', 'opt2': 'c', 'foo': 'bar'}
+
+        # arguments overridden in place by conflict resolution are respected
+        parser = argparse_helpers.mangle_parser(
+            arghparse.OptionalsParser(conflict_handler='resolve'))
+        parser.add_argument('--foo', default='a')
+        args, _ = parser.parse_known_optionals([])
+        assert vars(args) == {'foo': 'a'}
+        parser.add_argument('--foo', dest='bar', default='b')
+        args, _ = parser.parse_known_optionals([])
+        assert vars(args) == {'bar': 'b'}
+        parser = argparse_helpers.mangle_parser(arghparse.ArgumentParser(
+            conflict_handler='resolve', color=False, suppress=True))
+        parser.add_argument('--foo', default='a')
+        assert vars(parser.parse_args([])) == {'foo': 'a'}
+        parser.add_argument('--foo', dest='bar', default='b')
+        assert vars(parser.parse_args([])) == {'bar': 'b'}
+
+    def test_required_and_converted_defaults(self):
+        self.optionals_parser.add_argument('--num', type=int, default='5')
+        parse = self.optionals_parser.parse_known_optionals
+        # string defaults are converted when the option isn't passed
+        args, _ = parse([])
+        assert args.num == 5
+        args, _ = parse(['--num', '3'])
+        assert args.num == 3
+
+        self.optionals_parser.add_argument('--req', required=True)
+        with pytest.raises(argparse_helpers.Error, match='required: --req'):
+            parse([])
+        args, _ = parse(['--req', 'x'])
+        assert args.req == 'x'
+
+    def test_mutually_exclusive(self):
+        group = self.optionals_parser.add_mutually_exclusive_group()
+        group.add_argument('--opt1', action='store_true')
+        group.add_argument('--opt2', action='store_true')
+        parse = self.optionals_parser.parse_known_optionals
+
+        args, unknown = parse(['--opt1'])
+        assert args.opt1
+        with pytest.raises(argparse_helpers.Error, match='not allowed with'):
+            parse(['--opt1', '--opt2'])
+
+        # conflicts are updated when arguments are added to groups after parsing
+        group.add_argument('--opt3', action='store_true')
+        with pytest.raises(argparse_helpers.Error, match='not allowed with'):
+            parse(['--opt3', '--opt1'])
+
+
+class TestSubcmdAbbrevArgumentParser:
+
+    def test_abbreviations(self):
+        parser = argparse_helpers.mangle_parser(arghparse.SubcmdAbbrevArgumentParser())
+        subparsers = parser.add_subparsers(dest='subcmd')
+        for subcmd in ('foo', 'bar', 'baz'):
+            subparsers.add_parser(subcmd)
+
+        assert parser.parse_args(['bar']).subcmd == 'bar'
+        # unique prefixes are expanded
+        assert parser.parse_args(['f']).subcmd == 'foo'
+        assert parser.parse_args(['baz']).subcmd == 'baz'
+        # ambiguous or unmatched prefixes aren't
+        for args in (['ba'], ['x']):
+            with pytest.raises(argparse_helpers.Error, match='invalid choice'):
+                parser.parse_args(args)
+
+        # newly added subcommands are recognized
+        subparsers.add_parser('bazaar')
+        assert parser.parse_args(['bar']).subcmd == 'bar'
+        assert parser.parse_args(['baz']).subcmd == 'baz'
+        assert parser.parse_args(['baza']).subcmd == 'bazaar'
+
 
 class TestCsvActionsParser:
 
@@ -165,6 +285,12 @@ class TestArgumentParser(TestCsvActionsParser, TestOptionalsParser):
             parser = argparse_helpers.mangle_parser(arghparse.ArgumentParser(debug=True))
             assert parser.debug is True
 
+        # early args can be passed explicitly instead
+        parser = arghparse.ArgumentParser(debug=True, argv=['--debug'])
+        assert parser.debug is True
+        parser = arghparse.ArgumentParser(debug=False, argv=['--debug'])
+        assert parser.debug is False
+
     def test_debug_disabled(self):
         parser = argparse_helpers.mangle_parser(arghparse.ArgumentParser(debug=False))
 
@@ -198,6 +324,42 @@ class TestArgumentParser(TestCsvActionsParser, TestOptionalsParser):
                 assert parser.verbosity == val, '{} failed'.format(args)
                 assert namespace.verbosity == val, '{} failed'.format(args)
 
+            parser = arghparse.ArgumentParser(quiet=True, verbose=True, argv=args)
+            assert parser.verbosity == val, '{} failed'.format(args)
+
+    def test_color(self):
+        parser = argparse_helpers.mangle_parser(arghparse.ArgumentParser(color=True))
+        # default is determined when parsing args
+        for isatty in (True, False):
+            with mock.patch('sys.stdout.isatty', return_value=isatty):
+                namespace = parser.parse_args([])
+            assert namespace.color is isatty
+        namespace = parser.parse_args(['--color', 'n'])
+        assert namespace.color is False
+
+    def test_delayed_values(self):
+        parser = argparse_helpers.mangle_parser(arghparse.ArgumentParser())
+        order = []
+
+        def delayed(namespace, attr):
+            order.append(attr)
+            setattr(namespace, attr, attr)
+
+        parser.set_defaults(
+            foo=arghparse.DelayedValue(delayed, 2),
+            bar=arghparse.DelayedValue(delayed, 1))
+        namespace = parser.parse_args([])
+        assert order == ['bar', 'foo']
+        assert (namespace.foo, namespace.bar) == ('foo', 'bar')
+
+        # delayed defaults run first and can wipe other delayed values
+        del order[:]
+        parser.set_defaults(wipe=arghparse.DelayedDefault.wipe('foo', 0))
+        namespace = parser.parse_args([])
+        assert order == ['bar']
+        assert not hasattr(namespace, 'foo')
+        assert not hasattr(namespace, 'wipe')
+
     def test_verbosity_disabled(self):
         parser = argparse_helpers.mangle_parser(
             arghparse.ArgumentParser(quiet=False, verbose=False))
@@ -270,7 +432,7 @@ class ParseStdinTest(BaseArgparseOptions):
             assert 'only valid when piping data in' in str(excinfo.value)
 
         # fake piping data in
-        for readlines, expected in (
+        for lines, expected in (
                 ([], []),
                 ([' '], []),
                 (['\n'], []),
@@ -283,7 +445,7 @@ class ParseStdinTest(BaseArgparseOptions):
         ):
             with mock.patch('sys.stdin') as stdin, \
                     mock.patch("builtins.open", mock.mock_open()) as mock_file:
-                stdin.readlines.return_value = readlines
+                stdin.__iter__.return_value = iter(lines)
                 stdin.isatty.return_value = False
                 namespace = self.parser.parse_args(['-'])
                 mock_file.assert_called_once_with("/dev/tty")
@@ -490,3 +652,40 @@ class TestManHelpAction:
             captured = capsys.readouterr()
             assert captured.out.strip().startswith('usage: ')
             popen.reset_mock()
+
+
+class TestVersionAction:
+
+    def test_version(self, capsys):
+        parser = argparse_helpers.mangle_parser(arghparse.ArgumentParser())
+        get_version = mock.Mock(return_value='foo 1.0')
+        parser.add_argument('--version', action=arghparse.Version, version=get_version)
+        # version info is only determined when the option is used
+        get_version.assert_not_called()
+        parser.parse_args([])
+        get_version.assert_not_called()
+        with pytest.raises(argparse_helpers.Exit):
+            parser.parse_args(['--version'])
+        get_version.assert_called_once()
+        captured = capsys.readouterr()
+        assert captured.out.strip() == 'foo 1.0'
+
+
+class TestExpansionAction(BaseArgparseOptions):
+
+    def test_expansion(self):
+        self.parser.add_argument('--foo', action='csv')
+        self.parser.add_argument('--bar', action='store_true')
+        self.parser.add_argument(
+            '--alias', action=arghparse.Expansion, nargs=1,
+            subst=(('--foo', 'a,%(0)s'), ('--bar',)))
+        namespace = self.parser.parse_args(['--alias', 'b'])
+        assert namespace.foo == ['a', 'b']
+        assert namespace.bar is True
+        assert namespace.alias is True
+
+    def test_unknown_option(self):
+        self.parser.add_argument(
+            '--alias', action=arghparse.Expansion, subst=(('--nonexistent',),))
+        with pytest.raises(ValueError, match='--nonexistent'):
+            self.parser.parse_args(['--alias'])
@@ -2,9 +2,11 @@ import os
 from io import StringIO
 
 import pytest
+from snakeoil import bash
 from snakeoil.bash import (BashParseError, iter_read_bash, read_bash,
                            read_bash_dict, read_dict)
 from snakeoil.fileutils import write_file
+from snakeoil.test import mk_cpy_loadable_testcase
 from snakeoil.test.mixins import mk_named_tempfile
 
 
@@ -184,8 +186,11 @@ class TestReadBashDict:
         }
         assert bash_dict == d
 
-        with pytest.raises(BashParseError):
+        with pytest.raises(BashParseError) as excinfo:
             self.invoke_and_close(StringIO("a=b\ny='"))
+        assert excinfo.value.line == 2
+        assert str(excinfo.value).endswith(
+            "on or before line 2: err No closing quotation")
 
     def test_var_read(self):
         assert self.invoke_and_close(StringIO("x=y@a\n")) == {'x': 'y@a'}
@@ -234,6 +239,9 @@ class TestReadBashDict:
         env_backup = env.copy()
         assert self.invoke_and_close(self.env_file.name, env) == {'imported': 'imported foo'}
         assert env_backup == env
+        # expanded values aren't subject to backslash cleansing
+        env = {'external': 'imported\\foo'}
+        assert self.invoke_and_close(self.env_file.name, env) == {'imported': 'imported\\foo'}
 
     def test_escaping(self):
         output = self.invoke_and_close(self.escaped_file.name)
@@ -248,5 +256,64 @@ class TestReadBashDict:
         with pytest.raises(BashParseError):
             self.invoke_and_close(self.unclosed_file.name)
 
+    def test_parser_reuse(self):
+        # parsers are reused, make sure no state leaks from a failed parse
+        with pytest.raises(BashParseError):
+            self.invoke_and_close(StringIO("a=b\ny='"))
+        with pytest.raises(BashParseError):
+            self.invoke_and_close(StringIO("a=b\nx y"))
+        assert self.invoke_and_close(StringIO("x=$a\n")) == {'x': ''}
+        assert self.invoke_and_close(StringIO("x=y")) == {'x': 'y'}
+
     def test_wordchards(self):
         assert self.invoke_and_close(StringIO("x=-*")) == {"x": "-*"}
+
+
+class TestVarTemplate:
+    func = staticmethod(bash.native_var_template)
+
+    def test_it(self):
+        for val, expected in (
+                ('', ('',)),
+                ('foo', ('foo',)),
+                ('$foo', ('', 'foo', '')),
+                ('x${foo}y$bar', ('x', 'foo', 'y', 'bar', '')),
+                ('\\$foo', ('$foo',)),
+                ('a\\b$foo\\', ('ab', 'foo', '\\')),
+                ('a\\\n$foo', ('a', 'foo', '')),
+                ):
+            assert self.func(val) == expected
+
+
+@pytest.mark.skipif(not bash.cpy_builtin, reason="cpython extension isn't available")
+class Test_CPY_VarTemplate(TestVarTemplate):
+    func = staticmethod(bash.var_template)
+
+
+class TestVarExpand:
+
+    def test_it(self):
+        env = {'foo': 'bar', 'baz': 'a\\b'}
+        for val, expected in (
+                ('', ''),
+                ('foo', 'foo'),
+                ('$foo', 'bar'),
+                ('${foo}', 'bar'),
+                ('x${foo}x$foo', 'xbarxbar'),
+                ('$unset', ''),
+                ('$baz', 'a\\b'),
+                ('\\$foo', '$foo'),
+                ('\\${foo}', '${foo}'),
+                ('\\\\$foo', '\\$foo'),
+                ('a\\b\\', 'ab\\'),
+                ('a\\\nb', 'ab'),
+                ):
+            assert bash.var_expand(val, env) == expected
+
+    def test_invalid_env(self):
+        with pytest.raises(ValueError):
+            bash.var_expand('$foo', {'foo': 1})
+
+
+cpy_loaded_Test = mk_cpy_loadable_testcase(
+    "snakeoil._bash", "snakeoil.bash", "var_template", "var_template")